@@ -44,7 +44,14 @@ from huggingface_hub import snapshot_download
 from bittensor.core.errors import MetadataError
 from pydantic import BaseModel, Field, validator, ValidationError
 from typing import Any, Dict, List, Optional, Union, Tuple, Sequence, Literal, TypeVar, Awaitable
-__version__ = "0.0.0"
+try:
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except ImportError:  # stdlib fallback; same call shape (str|bytes in, bytes out)
+    orjson = None
+    _loads = json.loads
+    def _dumps(obj, **_) -> bytes: return json.dumps(obj, separators=(",", ":")).encode()
+__version__ = "0.0.2"  # 0.0.1: challenge_id hashes orjson canonical bytes; 0.0.2: results sign challenge_id
 
 from .logging import *
 
@@ -77,18 +84,33 @@ async def get_subtensor():
             logger.trace("Connected to fallback")
     return SUBTENSOR
 
+async def reset_subtensor():
+    """Drop (and best‑effort close) the cached connection so the next get_subtensor() reconnects."""
+    global SUBTENSOR
+    sub, SUBTENSOR = SUBTENSOR, None
+    if sub is not None:
+        try: await sub.close()
+        except Exception: pass
+
 # --------------------------------------------------------------------------- #
 #                           Base‑level data models                            #
 # --------------------------------------------------------------------------- #
 def _truncate(t: Optional[str], max_len: int = 80) -> str:
     return "" if not t else textwrap.shorten(t, width=max_len, placeholder="…")
 
+def _canonical(obj: Any) -> bytes:
+    """Canonical JSON bytes (sorted keys, compact, UTF-8) for content hashing."""
+    if orjson is not None:
+        try: return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError: pass  # e.g. ints wider than 64 bits
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
 class BaseEnv(BaseModel, ABC):
     """Abstract competition environment."""
     class Config: arbitrary_types_allowed = True
     @property
     def name(self) -> str: return self.__class__.__name__
-    def __hash__(self):     return hash(self.name)
+    def __hash__(self):     return hash(type(self).__name__)  # str hashes are cached
     def __repr__(self):     return self.name
     # API expected from concrete envs
     @abstractmethod
@@ -96,6 +118,15 @@ class BaseEnv(BaseModel, ABC):
     @abstractmethod
     async def evaluate(self, challenge: "Challenge", response: "Response") -> "Evaluation": ...
 
+_ENV_SINGLETONS: Dict[str, BaseEnv] = {}
+def _env_instance(name: str) -> BaseEnv:
+    """Shared env instance for an env name coming from a serialised payload."""
+    env = _ENV_SINGLETONS.get(name)
+    if env is None:
+        # ENVS is bound at module level by `from .envs import *` below.
+        env = _ENV_SINGLETONS[name] = ENVS[name]()
+    return env
+
 # --------------------------------------------------------------------------- #
 #                         Models with new (de)serialisation                   #
 # --------------------------------------------------------------------------- #
@@ -112,14 +143,11 @@ class Challenge(BaseModel):
             extra = values.get("extra", {})
             if not isinstance(env, str): env = env.name
             base_dict = { "env": env,"prompt": prompt, "extra": extra}
-            canonical = json.dumps(base_dict, sort_keys=True, separators=(",", ":"))
-            cid = hashlib.sha256(canonical.encode()).hexdigest()
-            values["challenge_id"] = cid
+            values["challenge_id"] = hashlib.sha256(_canonical(base_dict)).hexdigest()
         return values
     @validator("env", pre=True)
     def _parse_env(cls, v):
-        from .envs import ENVS as _ENVS
-        return _ENVS[v]() if isinstance(v, str) else v
+        return _env_instance(v) if isinstance(v, str) else v
     class Config:
         arbitrary_types_allowed = True
         json_encoders = {BaseEnv: lambda v: v.name}
@@ -137,8 +165,7 @@ class Evaluation(BaseModel):
     extra: Dict[str, Any] = Field(default_factory=dict)
     @validator("env", pre=True)
     def _parse_env(cls, v):
-        from .envs import ENVS as _ENVS
-        return _ENVS[v]() if isinstance(v, str) else v
+        return _env_instance(v) if isinstance(v, str) else v
     class Config:
         arbitrary_types_allowed = True
         json_encoders = {BaseEnv: lambda v: v.name}
@@ -176,11 +203,14 @@ class Result(BaseModel):
     challenge: Challenge
     response: Response
     evaluation: Evaluation
+    def sign_payload(self) -> str:
+        # Results before 0.0.2 signed the (truncating) challenge repr; newer ones sign its content hash.
+        return str(self.challenge) if self.version in ("0.0.0", "0.0.1") else self.challenge.challenge_id
     def sign(self, wallet):
         self.hotkey = wallet.hotkey.ss58_address
-        self.signature = (wallet.hotkey.sign( data = str(self.challenge) )).hex()
+        self.signature = (wallet.hotkey.sign( data = self.sign_payload() )).hex()
     def verify( self ) -> bool:
-        return bt.Keypair(ss58_address=self.hotkey).verify( data = str(self.challenge), signature = bytes.fromhex( self.signature) )
+        return bt.Keypair(ss58_address=self.hotkey).verify( data = self.sign_payload(), signature = bytes.fromhex( self.signature) )
     class Config:
         arbitrary_types_allowed = True
         json_encoders = {BaseEnv: lambda v: v.name}
@@ -253,17 +283,7 @@ def upload_dataset_cmd(dataset_name: str, config: str, split: str):
         async with sm() as session:
             def _make_stmt(rows: list[dict]):
                 af.logger.debug(f"Preparing statement for batch of size: {len(rows)}")
-                values = [
-                    {
-                        "dataset_name": dataset_name,
-                        "config": config,
-                        "split": split,
-                        "row_index": r["__row_index__"],
-                        "data": {k: v for k, v in r.items() if k != "__row_index__"},
-                    }
-                    for r in rows
-                ]
-                stmt = _pg_insert(dataset_rows).values(values)
+                stmt = _pg_insert(dataset_rows).values(rows)
                 # Idempotent upsert: on conflict, do nothing
                 stmt = stmt.on_conflict_do_nothing(index_elements=[
                     dataset_rows.c.dataset_name,
@@ -301,18 +321,22 @@ def upload_dataset_cmd(dataset_name: str, config: str, split: str):
                         await asyncio.sleep(delay)
                         delay = min(delay * 2, 5.0)
 
-            # Iterate rows
+            # Iterate rows; each HF row is already a fresh dict, so it becomes the JSONB payload as-is
             for row in ds:  # type: ignore
                 # Attach running index; if HF provides _keys, we still assign our own index
-                payload = dict(row)
-                payload["__row_index__"] = idx
-                batch.append(payload)
+                batch.append({
+                    "dataset_name": dataset_name,
+                    "config": config,
+                    "split": split,
+                    "row_index": idx,
+                    "data": row,
+                })
                 idx += 1
                 if len(batch) >= BATCH:
                     await _execute_batch_with_retries(batch)
                     batch.clear()
-                # Show progress
-                af.logger.info(f"Progress: {idx}/{total_rows} rows uploaded")
+                    # Show progress once per committed batch, not per row
+                    af.logger.info(f"Progress: {idx}/{total_rows} rows uploaded")
 
             if batch:
                 af.logger.debug(f"Executing final batch of size: {len(batch)}")
@@ -5,14 +5,12 @@
 # --------------------------------------------------------------------------- #
 from __future__ import annotations
 import os
-import json
 import time
 import random
 import aiohttp
 import asyncio
 import requests
-from huggingface_hub import HfApi
-from typing import Any, Dict, List, Optional, Union, Tuple, Sequence, Literal, TypeVar, Awaitable
+from typing import Any, Dict, List, Optional, Union, Tuple, Sequence, Literal, TypeVar, Awaitable, AsyncIterator
 
 import affine as af
 
@@ -42,15 +40,13 @@ async def check_model_gated(model_id: str, revision: Optional[str] = None) -> Op
         if cached and now - cached[1] < GATING_TTL:
             return cached[0]
         try:
-            r = await asyncio.to_thread(requests.get, f"https://huggingface.co/api/models/{model_id}", timeout=5)
+            # One request: the revision endpoint returns the same model info (incl. `gated`).
+            url = f"https://huggingface.co/api/models/{model_id}"
+            r = await asyncio.to_thread(requests.get, f"{url}/revision/{revision}" if revision else url, timeout=5)
+            if r.status_code != 200 and revision:
+                r = await asyncio.to_thread(requests.get, url, timeout=5)
             if r.status_code == 200:
-                is_gated = r.json().get("gated", False)
-                if revision:
-                    try:
-                        ok = await asyncio.to_thread(lambda: bool(HfApi(token=os.getenv("HF_TOKEN")).repo_info(repo_id=model_id, revision=revision, repo_type="model")))
-                        if not ok: is_gated = True
-                    except:
-                        pass
+                is_gated = af._loads(r.content).get("gated", False)
                 MODEL_GATING_CACHE[model_id] = (is_gated, now)
                 return is_gated
         except Exception as e:
@@ -63,22 +59,9 @@ async def check_model_gated(model_id: str, revision: Optional[str] = None) -> Op
 # --------------------------------------------------------------------------- #
 #                               QUERY                                         #
 # --------------------------------------------------------------------------- #
-# Lazy-initialised semaphore and shared HTTP client
-_HTTP_SEMS: Dict[int, asyncio.Semaphore] = {}
+# Lazy-initialised shared HTTP client; its connector limit bounds concurrency.
 _CLIENTS: Dict[int, aiohttp.ClientSession] = {}
 
-async def _get_sem() -> asyncio.Semaphore:
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.get_event_loop()
-    key = id(loop)
-    sem = _HTTP_SEMS.get(key)
-    if sem is None:
-        sem = asyncio.Semaphore(int(os.getenv("AFFINE_HTTP_CONCURRENCY", "400")))
-        _HTTP_SEMS[key] = sem
-    return sem
-
 async def _get_client() -> aiohttp.ClientSession:
     try:
         loop = asyncio.get_running_loop()
@@ -89,7 +72,7 @@ async def _get_client() -> aiohttp.ClientSession:
     if client is None or client.closed:
         limit = int(os.getenv("AFFINE_HTTP_CONCURRENCY", "400"))  # raise this
         conn = aiohttp.TCPConnector(
-            limit=limit,              # match or exceed your semaphore
+            limit=limit,              # caps in-flight requests; excess waits in the connector
             limit_per_host=0,         # don’t artificially throttle per host
             ttl_dns_cache=300,        # cache DNS results
             enable_cleanup_closed=True
@@ -101,29 +84,53 @@ async def _get_client() -> aiohttp.ClientSession:
         _CLIENTS[key] = client
     return client
 
+async def close_client() -> None:
+    """Close the shared HTTP client bound to the running loop, if any."""
+    key = id(asyncio.get_running_loop())
+    client = _CLIENTS.pop(key, None)
+    if client is not None and not client.closed:
+        await client.close()
+
+T = TypeVar("T")
+async def closing_client(aw: Awaitable[T]) -> T:
+    """Await `aw`, then close the loop's shared client (for one-shot `asyncio.run` entry points)."""
+    try:
+        return await aw
+    finally:
+        await close_client()
+
 
 TERMINAL = {400, 404, 410}
+_QUERY_HDR: Optional[Dict[str, str]] = None
+def _query_headers() -> Dict[str, str]:
+    """Chutes request headers, built once (the API key is fixed for the process)."""
+    global _QUERY_HDR
+    if _QUERY_HDR is None:
+        _QUERY_HDR = {"Authorization": f"Bearer {af.get_conf('CHUTES_API_KEY')}", "Content-Type": "application/json"}
+    return _QUERY_HDR
+
+def _response(resp, attempts, err, ok, start, model) -> af.Response:
+    return af.Response(response=resp, latency_seconds=time.monotonic()-start,
+                       attempts=attempts, model=model, error=err, success=ok)
+
 async def query(prompt, model: str = "unsloth/gemma-3-12b-it", slug: str = "llm", timeout=150, retries=0, backoff=1) -> af.Response:
     url = f"https://{slug}.chutes.ai/v1/chat/completions"
-    hdr = {"Authorization": f"Bearer {af.get_conf('CHUTES_API_KEY')}", "Content-Type": "application/json"}
+    hdr = _query_headers()
     start = time.monotonic()
-    af.QCOUNT.labels(model=model).inc()
-    R = lambda resp, at, err, ok: af.Response(response=resp, latency_seconds=time.monotonic()-start,
-                                          attempts=at, model=model, error=err, success=ok)
+    af.labelled(af.QCOUNT, model).inc()
+    body = af._dumps({"model": model, "messages": [{"role": "user", "content": prompt}]})
     sess = await _get_client()
-    sem = await _get_sem()
     for attempt in range(1, retries+2):
         try:
-            payload = {"model": model, "messages": [{"role": "user", "content": prompt}]}
-            async with sem, sess.post(url, json=payload,
-                                      headers=hdr, timeout=timeout) as r:
+            async with sess.post(url, data=body,
+                                 headers=hdr, timeout=timeout) as r:
                     txt = await r.text(errors="ignore")
-                    if r.status in TERMINAL: return R(None, attempt, f"{r.status}:{txt}", False)
+                    if r.status in TERMINAL: return _response(None, attempt, f"{r.status}:{txt}", False, start, model)
                     r.raise_for_status()
-                    content = (await r.json())["choices"][0]["message"]["content"]
-                    return R(content, attempt, None, True)
+                    content = af._loads(txt)["choices"][0]["message"]["content"]
+                    return _response(content, attempt, None, True, start, model)
         except Exception as e:
-            if attempt > retries: return R(None, attempt, str(e), False)
+            if attempt > retries: return _response(None, attempt, str(e), False, start, model)
             await asyncio.sleep(backoff * 2**(attempt-1) * (1 + random.uniform(-0.1, 0.1)))
 
 LOG_TEMPLATE = (
@@ -137,6 +144,10 @@ LOG_TEMPLATE = (
     "{latency:>6.3f}s"
 )
 async def run(challenges, miners, timeout=240, retries=0, backoff=1 )-> List[af.Result]:
+    return [result async for result in run_stream(challenges, miners, timeout, retries, backoff)]
+
+async def run_stream(challenges, miners, timeout=240, retries=0, backoff=1) -> AsyncIterator[af.Result]:
+    """Like `run`, but yields each Result as soon as it completes."""
     if not isinstance(challenges, list): challenges = [challenges]
     if isinstance(miners, af.Miner): miners = [miners]
     if isinstance(miners, dict):  mmap = miners
@@ -144,7 +155,6 @@ async def run(challenges, miners, timeout=240, retries=0, backoff=1 )-> List[af.
     else: mmap = await miners(miners)
     
     af.logger.trace("Running challenges: %s on miners: %s", [chal.prompt[:30] for chal in challenges], list(mmap.keys()))
-    response = []
     
     async def proc(miner, chal):
         # Check gating status before querying
@@ -165,21 +175,26 @@ async def run(challenges, miners, timeout=240, retries=0, backoff=1 )-> List[af.
     
     tasks = [ asyncio.create_task(proc(m, chal)) for m in mmap.values() if m.model for chal in challenges]  
     total = len(tasks); completed = 0
-    for task in asyncio.as_completed(tasks): 
-        result: af.Result = await task
-        response.append(result); completed += 1
-        af.logger.debug(
-            LOG_TEMPLATE.format(
-                pct    = completed / total * 100,
-                env    = result.challenge.env.name,                   
-                uid    = result.miner.uid,                 
-                model  = result.miner.model[:50] or "",         
-                success= "RECV" if result.response.success else "NULL",
-                score  = result.evaluation.score,
-                latency= result.response.latency_seconds
+    try:
+        for task in asyncio.as_completed(tasks): 
+            result: af.Result = await task
+            completed += 1
+            af.logger.debug(
+                LOG_TEMPLATE.format(
+                    pct    = completed / total * 100,
+                    env    = result.challenge.env.name,                   
+                    uid    = result.miner.uid,                 
+                    model  = result.miner.model[:50] or "",         
+                    success= "RECV" if result.response.success else "NULL",
+                    score  = result.evaluation.score,
+                    latency= result.response.latency_seconds
+                )
             )
-        )
-    return response
+            yield result
+    finally:
+        # Consumer stopped early (or a task raised): don't leave queries running.
+        for t in tasks:
+            if not t.done(): t.cancel()
 
 
 # --------------------------------------------------------------------------- #
@@ -189,35 +204,36 @@ async def get_chute(chutes_id: str) -> Dict[str, Any]:
     url = f"https://api.chutes.ai/chutes/{chutes_id}"
     token = os.getenv("CHUTES_API_KEY", "")
     headers = {"Authorization": token}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as r:
-            text = await r.text(errors="ignore")
-            if r.status != 200:
-                return None
-            info = await r.json()
-            for k in ('readme','cords','tagline','instances'):
-                info.pop(k, None)
-            info.get('image', {}).pop('readme', None)
-            return info
+    session = await _get_client()
+    async with session.get(url, headers=headers, timeout=aiohttp.client.DEFAULT_TIMEOUT) as r:
+        text = await r.text(errors="ignore")
+        if r.status != 200:
+            return None
+        info = af._loads(text)
+        for k in ('readme','cords','tagline','instances'):
+            info.pop(k, None)
+        info.get('image', {}).pop('readme', None)
+        return info
         
 async def get_chute_code(identifier: str) -> Optional[str]:
     url = f"https://api.chutes.ai/chutes/code/{identifier}"
     token = os.getenv("CHUTES_API_KEY", "")
     headers = {"Authorization": token}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as r:
-            if r.status != 200:
-                return None
-            return await r.text(errors="ignore")
+    session = await _get_client()
+    async with session.get(url, headers=headers, timeout=aiohttp.client.DEFAULT_TIMEOUT) as r:
+        if r.status != 200:
+            return None
+        return await r.text(errors="ignore")
 
 async def get_latest_chute_id(model_name: str, api_key: Optional[str] = None) -> Optional[str]:
     token = api_key or os.getenv("CHUTES_API_KEY", ""); 
     if not token: return None
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://api.chutes.ai/chutes/", headers={"Authorization": token}) as r:
-                if r.status != 200: return None
-                data = await r.json()
+        session = await _get_client()
+        async with session.get("https://api.chutes.ai/chutes/", headers={"Authorization": token},
+                               timeout=aiohttp.client.DEFAULT_TIMEOUT) as r:
+            if r.status != 200: return None
+            data = await r.json(loads=af._loads)
     except Exception: return None
     chutes = data.get("items", data) if isinstance(data, dict) else data
     if not isinstance(chutes, list): return None
@@ -237,6 +253,13 @@ async def get_miners(
     commits = await sub.get_all_revealed_commitments(netuid)
     if uids is None:uids = list(range(len(meta.hotkeys)))
     elif isinstance(uids, int): uids = [uids]    
+    # Several uids often commit the same chute: fetch each chute id once and share the result.
+    chute_tasks: Dict[str, asyncio.Task] = {}
+    def chute_for(chute_id: str) -> asyncio.Task:
+        task = chute_tasks.get(chute_id)
+        if task is None:
+            task = chute_tasks[chute_id] = asyncio.ensure_future(get_chute(chute_id))
+        return task
     async def fetch(uid: int):
         try:
             hotkey = meta.hotkeys[ uid ]
@@ -244,10 +267,10 @@ async def get_miners(
             commit = commits[hotkey]
             block, data = commit[-1]     
             block = 0 if uid == 0 else block
-            data = json.loads(data)
+            data = af._loads(data)
             model, miner_revision, chute_id = data.get("model"), data.get("revision"), data.get("chute_id")
-            chute = await get_chute(chute_id)
-            if not chute: None
+            chute = await chute_for(chute_id)
+            if not chute: return None
             gated = await check_model_gated(model)
             if gated: return None
             chutes_name, slug, chutes_revision = chute.get('name'), chute.get("slug"), chute.get("revision")
@@ -111,6 +111,13 @@ dataset_rows = Table(
 Index("ix_ds_name", dataset_rows.c.dataset_name)
 Index("ix_ds_ns", dataset_rows.c.dataset_name, dataset_rows.c.config, dataset_rows.c.split, dataset_rows.c.row_index)
 
+def _json_serializer(obj: Any) -> str:
+    """JSONB encoder for the engine: orjson in C, stdlib json for what orjson rejects (e.g. >64-bit ints)."""
+    if af.orjson is not None:
+        try: return af.orjson.dumps(obj, option=af.orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError: pass
+    return json.dumps(obj)
+
 _engine: Optional[Any] = None
 _sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
 
@@ -187,8 +194,7 @@ async def _get_engine():
         pool_size = int(os.getenv("DB_POOL_SIZE", os.getenv("POOL_SIZE", "4")))
         max_overflow = int(os.getenv("DB_MAX_OVERFLOW", os.getenv("MAX_OVERFLOW", "2")))
         pool_timeout = int(os.getenv("DB_POOL_TIMEOUT", os.getenv("POOL_TIMEOUT", "60")))
-        _engine = create_async_engine(
-            DATABASE_URL,
+        engine_kw = dict(
             echo=False,
             connect_args={"ssl": "require"},
             pool_pre_ping=True,
@@ -197,7 +203,9 @@ async def _get_engine():
             pool_size=pool_size,
             max_overflow=max_overflow,
             pool_use_lifo=True,
+            json_serializer=_json_serializer,
         )
+        _engine = create_async_engine(DATABASE_URL, **engine_kw)
         _sessionmaker = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
         try:
             async with _engine.begin() as conn:
@@ -208,17 +216,7 @@ async def _get_engine():
             if ("invalidcatalogname" in msg) or ("does not exist" in msg and "database" in msg):
                 await _ensure_database_exists(DATABASE_URL)
                 await _engine.dispose()
-                _engine = create_async_engine(
-                    DATABASE_URL,
-                    echo=False,
-                    connect_args={"ssl": "require"},
-                    pool_pre_ping=True,
-                    pool_recycle=180,
-                    pool_timeout=pool_timeout,
-                    pool_size=pool_size,
-                    max_overflow=max_overflow,
-                    pool_use_lifo=True,
-                )
+                _engine = create_async_engine(DATABASE_URL, **engine_kw)
                 _sessionmaker = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
                 await asyncio.sleep(0.5)
                 async with _engine.begin() as conn:
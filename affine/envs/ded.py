@@ -1,11 +1,13 @@
 from __future__ import annotations
+import os
+import re
 import ast
 import time
 import json
 import asyncio
 import subprocess
 import affine as af
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 # -------------------------------- Helpers -------------------------------- #
 def _to_str(x) -> str:
@@ -23,12 +25,35 @@ def _to_str(x) -> str:
     # Dicts / numbers / other scalars → JSON text
     return json.dumps(x, ensure_ascii=False)
 
+def _json_args(args: Any) -> Optional[str]:
+    """JSON text for `args` if it round‑trips losslessly (tuples, non‑str keys, NaN don't)."""
+    try:
+        text = json.dumps(args)
+    except (TypeError, ValueError):
+        return None
+    return text if json.loads(text) == args else None
+
+# Reads the JSON call args before any submission code runs, leaving stdin at EOF exactly as the
+# old empty stdin did (top-level input()/sys.stdin.read() in the program behave unchanged).
+_ARGS_PROLOGUE = "import sys as _sys, json as _json; _affine_args = _sys.stdin.read()"
+_FUTURE_RE = re.compile(r"^from[ \t]+__future__[ \t]+import\b(?:[^\n(]*\([^)]*\))?[^\n]*", re.M)
+
+def _with_args_prologue(program: str) -> str:
+    """`program` with the args prologue as its first statement after any `from __future__` imports."""
+    last = None
+    for last in _FUTURE_RE.finditer(program):
+        pass
+    if last is None:
+        return _ARGS_PROLOGUE + "\n" + program
+    return program[: last.end()] + "\n" + _ARGS_PROLOGUE + program[last.end():]
+
 # --------------------------------------------------------------------------- #
 #                           Utility functions                                 #
 # --------------------------------------------------------------------------- #
 def _normalize(text: str) -> str:
     """Trim trailing blank lines and per‑line trailing spaces."""
-    return "\n".join(line.rstrip() for line in text.rstrip().splitlines())
+    # str methods only: a regex rewrite was measured 1.3-8x slower on large outputs.
+    return "\n".join(map(str.rstrip, text.rstrip().splitlines()))
 
 
 # --------------------------------------------------------------------------- #
@@ -68,8 +93,12 @@ class DED(af.BaseEnv):
         return af.Challenge(env=self, prompt=prompt, extra=sample)
 
     async def evaluate(
-        self, challenge: af.Challenge, response: af.Response
+        self, challenge: af.Challenge, response: af.Response, fast_fail: bool = True
     ) -> af.Evaluation:
+        """
+        All-or-nothing scoring over the row's test cases. With `fast_fail` the first failing
+        case cancels the rest (feedback then lists only finished cases and sets `early_exit`).
+        """
         af.logger.trace("Starting evaluation of the challenge.")
         raw_reply = response.response
         program = self._executor._strip_fences(raw_reply)
@@ -108,10 +137,11 @@ class DED(af.BaseEnv):
             )
         af.logger.trace(f"Found {len(cases)} test cases.")
 
-        loop = asyncio.get_running_loop()
-        passed, total = 0, len(cases)
-        details = []
-
+        # Stdin payloads, programs and normalised expected outputs are fixed for the row:
+        # build them once, before anything runs. Unknown case types are skipped and
+        # don't count towards the total.
+        prepared: List[Tuple[int, str, str, str]] = []
+        args_program: Optional[str] = None   # program + args prologue, built on first use
         for i, case in enumerate(cases, start=1):
             ctype = case.get("type")
             raw_inp = case.get("input")
@@ -127,53 +157,83 @@ class DED(af.BaseEnv):
                 fn = case.get("fn_name")
                 # input is a list of args
                 args = case.get("input", [])
-                # wrap program with a call to fn(...) and print its result
+                # wrap program with a call to fn(...) and print its result; args travel as
+                # JSON on stdin so the child doesn't compile a (possibly huge) literal
+                inp = _json_args(args)
+                if inp is not None:
+                    if args_program is None:
+                        args_program = _with_args_prologue(program)
+                    base, call_args = args_program, "_json.loads(_affine_args)"
+                else:
+                    base, call_args, inp = program, repr(args), ""
                 exec_prog = (
-                    program
+                    base
                     + "\n"
                     + f"if __name__ == '__main__':\n"
-                    + f"    result = {fn}(*{args!r})\n"
+                    + f"    result = {fn}(*{call_args})\n"
                     + "    print(result)"
                 )
-                inp = ""  # no stdin
                 exp = _to_str(raw_exp[0]) if isinstance(raw_exp, list) and raw_exp else _to_str(raw_exp)
             else:
                 af.logger.trace(f"Unknown test case type '{ctype}', skipping.")
-                total -= 1
                 continue
+            prepared.append((i, exec_prog, inp, _normalize(exp)))
+        total = len(prepared)
 
-            try:
-                out, err = await loop.run_in_executor(
-                    None, self._executor.execute, exec_prog, inp
-                )
-            except subprocess.TimeoutExpired:
-                out, err = "", "TIMEOUT"
+        loop = asyncio.get_running_loop()
+        # stdin cases share `program` and function calls to the same fn share their
+        # harness: write each distinct source once and reuse it across cases.
+        progs = {src: self._executor.prepare(src) for _, src, _, _ in prepared}
+        # Cases are independent subprocesses: run them concurrently, bounded by CPU count.
+        sem = asyncio.Semaphore(max(1, min(total, os.cpu_count() or 1)))
+
+        async def _run_case(i: int, exec_prog: str, inp: str, exp_norm: str) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    out, err = await loop.run_in_executor(
+                        None, progs[exec_prog].run, inp
+                    )
+                except subprocess.TimeoutExpired:
+                    out, err = "", "TIMEOUT"
 
-            ok_run = not err.strip()
             out_norm = _normalize(out)
-            exp_norm = _normalize(exp) if exp is not None else None
-            correct = ok_run and (exp_norm is None or out_norm == exp_norm)
+            correct = not err.strip() and out_norm == exp_norm
             if correct:
-                passed += 1
                 af.logger.trace(f"Test case {i} passed.")
             else:
                 af.logger.trace(
                     f"Test case {i} failed. Got: {out_norm!r}, Expected: {exp_norm!r}"
                 )
 
-            details.append(
-                {
-                    "input": inp,
-                    "expected": exp_norm,
-                    "got": out_norm,
-                    "stderr": err.strip(),
-                    "passed": correct,
-                }
-            )
+            return {
+                "input": inp,
+                "expected": exp_norm,
+                "got": out_norm,
+                "stderr": err.strip(),
+                "passed": correct,
+            }
+
+        tasks = [asyncio.create_task(_run_case(*p)) for p in prepared]
+        early_exit = False
+        try:
+            for fut in asyncio.as_completed(tasks):
+                d = await fut
+                if fast_fail and not d["passed"]:
+                    early_exit = True
+                    break
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for prog in progs.values():
+                prog.close()
+        details = [t.result() for t in tasks if not t.cancelled() and t.exception() is None]   # case order
+        passed = sum(d["passed"] for d in details)
 
         score = 1.0 if passed == total else 0.0
-        feedback = json.dumps(
-            {"passed": passed, "total": total, "tests": details}, ensure_ascii=False
-        )
+        summary = {"passed": passed, "total": total, "tests": details}
+        if early_exit:
+            summary["early_exit"] = True
+        feedback = json.dumps(summary, ensure_ascii=False)
         af.logger.trace(f"Evaluation completed with score: {score}")
         return af.Evaluation(env=self, score=score, feedback=feedback)
\ No newline at end of file
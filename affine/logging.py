@@ -39,6 +39,15 @@ NRESULTS = Gauge( "nresults", "nresults", registry=REGISTRY)
 MAXENV = Gauge("maxenv", "maxenv", ["env"], registry=REGISTRY)
 CACHE = Gauge( "cache", "cache", registry=REGISTRY)
 
+_LABELLED: Dict[Tuple[Any, Tuple[str, ...]], Any] = {}
+def labelled(metric, *values):
+    """Cached `metric.labels(*values)`: skips the client's locked child lookup on hot paths."""
+    key = (metric, tuple(str(v) for v in values))
+    child = _LABELLED.get(key)
+    if child is None:
+        child = _LABELLED[key] = metric.labels(*values)
+    return child
+
 
 # --------------------------------------------------------------------------- #
 #                               Logging                                       #
@@ -7,6 +7,7 @@ import os
 import sys
 import json
 import click
+import hashlib
 import asyncio
 import textwrap
 from .utils import *
@@ -14,10 +15,14 @@ import bittensor as bt
 from pathlib import Path
 from huggingface_hub import HfApi
 from huggingface_hub import snapshot_download
+from huggingface_hub import CommitOperationAdd, RepoFile
 from bittensor.core.errors import MetadataError
 from typing import Any, Dict, List, Optional, Union, Tuple, Sequence, Literal, TypeVar, Awaitable
 
 import affine as af
+
+BLOCK_TIME_SEC = 12.0  # chain block interval; caps the warmup hot-status poll backoff
+
 # --------------------------------------------------------------------------- #
 #                              Pull Model                                     #
 # --------------------------------------------------------------------------- #
@@ -32,7 +37,7 @@ def pull(uid: int, model_path: str, hf_token: str):
     hf_token     = hf_token or af.get_conf("HF_TOKEN")
 
     # 2. Lookup miner on‑chain
-    miner_map = asyncio.run(af.get_miners(uids=uid))
+    miner_map = asyncio.run(af.closing_client(af.get_miners(uids=uid)))
     miner = miner_map.get(uid)
     
     if miner is None:
@@ -114,46 +119,65 @@ def push(model_path: str, existing_repo: str, revision: str, coldkey: str, hotke
                 if not (fname.startswith(".") or fname.endswith(".lock")):
                     files.append(os.path.join(root, fname))
 
-        # Upload files with limited concurrency to avoid HF 429 errors
-        SEM = asyncio.Semaphore(int(os.getenv("AFFINE_UPLOAD_CONCURRENCY", "2")))
-
-        async def _upload(path: str):
-            rel = os.path.relpath(path, model_path)
-            async with SEM:  # limit concurrent commits
-                await asyncio.to_thread(
-                    lambda: api.upload_file(
-                        path_or_fileobj=path,
-                        path_in_repo=rel,
-                        repo_id=repo_name,
-                        repo_type="model"
-                    )
-                )
-                af.logger.debug("Uploaded %s", rel)
+        def _unchanged(path: str, remote: Optional[RepoFile]) -> bool:
+            """True if `path` already matches the repo head (LFS sha256, else git blob sha1)."""
+            if remote is None:
+                return False
+            size = os.path.getsize(path)
+            lfs = remote.lfs
+            if size != (lfs.size if lfs else remote.size):
+                return False
+            h = hashlib.sha256() if lfs else hashlib.sha1(b"blob %d\0" % size)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            return h.hexdigest() == (lfs.sha256 if lfs else remote.blob_id)
 
-        await asyncio.gather(*(_upload(p) for p in files))
-        af.logger.debug("Model upload complete (%d files)", len(files))
+        def _plan() -> List[CommitOperationAdd]:
+            try:
+                tree = api.list_repo_tree(repo_id=repo_name, repo_type="model", recursive=True)
+                remote = {f.path: f for f in tree if isinstance(f, RepoFile)}
+            except Exception:
+                remote = {}  # new/empty repo: upload everything
+            ops = []
+            for path in files:
+                rel = os.path.relpath(path, model_path).replace(os.sep, "/")
+                if _unchanged(path, remote.get(rel)):
+                    af.logger.debug("Unchanged, skipping %s", rel)
+                else:
+                    ops.append(CommitOperationAdd(path_in_repo=rel, path_or_fileobj=path))
+            return ops
 
-    asyncio.run(deploy_model_to_hf()) if not existing_repo else af.logger.debug("Skipping model upload because --existing-repo was provided")
+        # Upload only changed files, all in one commit (HF pipelines the blob uploads).
+        ops = await asyncio.to_thread(_plan)
+        if not ops:
+            af.logger.debug("Model files already up to date (%d files)", len(files))
+            return
+        await asyncio.to_thread(
+            lambda: api.create_commit(
+                repo_id=repo_name,
+                repo_type="model",
+                operations=ops,
+                commit_message=f"Upload {len(ops)} model files",
+            )
+        )
+        af.logger.debug("Model upload complete (%d of %d files)", len(ops), len(files))
 
     # -----------------------------------------------------------------------------
     # 5. Fetch latest revision hash
     # -----------------------------------------------------------------------------
-    if revision:
-        af.logger.debug("Using user-supplied revision: %s", revision)
-    else:
-        info      = api.repo_info(repo_id=repo_name, repo_type="model")
-        revision  = getattr(info, "sha", getattr(info, "oid", "")) or ""
-        af.logger.debug("Latest revision from HF: %s", revision)
+    def latest_revision() -> str:
+        info = api.repo_info(repo_id=repo_name, repo_type="model")
+        return getattr(info, "sha", getattr(info, "oid", "")) or ""
 
     # -----------------------------------------------------------------------------
     # 6. Commit model revision on-chain
     # -----------------------------------------------------------------------------
     chute_id = None
 
-    async def commit_to_chain():
+    async def commit_to_chain(sub):
         """Submit the model commitment, retrying on quota errors."""
         af.logger.debug("Preparing on-chain commitment")
-        sub     = await af.get_subtensor()
         payload = json.dumps({"model": repo_name, "revision": revision, "chute_id": chute_id})
         while True:
             try:
@@ -171,11 +195,12 @@ def push(model_path: str, existing_repo: str, revision: str, coldkey: str, hotke
     # -----------------------------------------------------------------------------
     # 7. Make HF repo public
     # -----------------------------------------------------------------------------
-    try:
-        api.update_repo_visibility(repo_id=repo_name, private=False)
-        af.logger.debug("Repo made public")
-    except Exception:
-        af.logger.trace("Failed to make repo public (already public?)")
+    def make_public():
+        try:
+            api.update_repo_visibility(repo_id=repo_name, private=False)
+            af.logger.debug("Repo made public")
+        except Exception:
+            af.logger.trace("Failed to make repo public (already public?)")
 
     # -----------------------------------------------------------------------------
     # 8. Deploy Chute
@@ -238,33 +263,53 @@ chute = build_sglang_chute(
         tmp_file.unlink(missing_ok=True)
         af.logger.debug("Chute deployment successful")
 
-    asyncio.run(deploy_to_chutes())
-
-    # -----------------------------------------------------------------------------
-    # 8b. Retrieve chute_id and commit on-chain
-    # -----------------------------------------------------------------------------
-    chute_id = asyncio.run(af.get_latest_chute_id(repo_name, api_key=chutes_api_key))
-
-    asyncio.run(commit_to_chain())
-
     # -----------------------------------------------------------------------------
     # 9. Warm up model until it’s marked hot
     # -----------------------------------------------------------------------------
-    async def warmup_model():
+    async def warmup_model(sub):
         af.logger.debug("Warming up model with SAT challenges")
-        sub       = await af.get_subtensor()
         meta      = await sub.metagraph(af.NETUID)
         my_uid    = meta.hotkeys.index(wallet.hotkey.ss58_address)
-        miner  = (await af.get_miners(netuid=af.NETUID))[my_uid]
+        miner  = (await af.get_miners(uids=my_uid, netuid=af.NETUID, meta=meta))[my_uid]
 
+        # Only the chute's hot flag changes from here on: poll just our chute, backing off
+        # up to one block, instead of re-resolving every miner on the subnet.
+        delay = 1.0
         while not (miner.chute or {}).get("hot", False):
             challenge = await af.SAT().generate()
             await af.run(challenges=challenge, miners=[miner])
-            await sub.wait_for_block()
-            miner = (await af.get_miners(netuid=af.NETUID))[my_uid]
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, BLOCK_TIME_SEC)
+            chute = await af.get_chute((miner.chute or {}).get("chute_id") or chute_id)
+            if chute:
+                miner.chute = chute
             af.logger.trace("Checked hot status: %s", (miner.chute or {}).get("hot"))
 
         af.logger.debug("Model is now hot and ready")
 
-    asyncio.run(warmup_model())
+    # -----------------------------------------------------------------------------
+    # 10. Run every step on one event loop: one subtensor and one HTTP client
+    # -----------------------------------------------------------------------------
+    async def push_main():
+        nonlocal revision, chute_id
+        if not existing_repo:
+            await deploy_model_to_hf()
+        else:
+            af.logger.debug("Skipping model upload because --existing-repo was provided")
+
+        if revision:
+            af.logger.debug("Using user-supplied revision: %s", revision)
+        else:
+            revision = await asyncio.to_thread(latest_revision)
+            af.logger.debug("Latest revision from HF: %s", revision)
+
+        await asyncio.to_thread(make_public)
+        await deploy_to_chutes()
+        # 8b. Retrieve chute_id and commit on-chain
+        chute_id = await af.get_latest_chute_id(repo_name, api_key=chutes_api_key)
+        sub = await af.get_subtensor()  # opened after the long upload/deploy steps, shared below
+        await commit_to_chain(sub)
+        await warmup_model(sub)
+
+    asyncio.run(af.closing_client(push_main()))
     af.logger.debug("Mining setup complete. Model is live!")  
@@ -3,10 +3,11 @@
 #                             Imports                                         #
 # --------------------------------------------------------------------------- #
 from __future__ import annotations
-import time, random, asyncio, traceback, contextlib
+import os, time, random, asyncio, traceback, contextlib
 from collections import defaultdict
 from typing import Dict, List, Tuple, Any
 import bittensor as bt
+from sqlalchemy.exc import InterfaceError, OperationalError
 import affine as af
 
 # --------------------------------------------------------------------------- #
@@ -26,18 +27,19 @@ def runner():
         EPS = 1e-3
         MINERS: Dict[int, any] = None
         MINER_BY_PAIR: Dict[Tuple[str, str], any] = {}
+        PAIRS: List[Tuple[str, str]] = []
         BACKOFF = defaultdict(float)
 
         async def refresh_miners():
-            nonlocal MINERS, MINER_BY_PAIR
+            nonlocal MINERS, MINER_BY_PAIR, PAIRS
             MINERS = await af.get_miners()
-            # build (hotkey, revision) → miner index
+            # build (hotkey, revision) → miner index; its keys are the selectable pairs until next refresh
             MINER_BY_PAIR = { (m.hotkey, m.revision): m for m in MINERS.values() }
+            PAIRS = list(MINER_BY_PAIR)
 
         COUNTS_PER_ENV: Dict[str, Dict[Tuple[str, str], int]] = None
         async def refresh_counts():
             nonlocal COUNTS_PER_ENV
-            PAIRS = [ (m.hotkey, m.revision) for m in MINERS.values() ]
             COUNTS_PER_ENV = await af.get_env_counts(pairs=PAIRS)
             
             # Get all valid env names from the ENVS registry
@@ -65,8 +67,8 @@ def runner():
         async def next():
             # Return if we still dont have any miners.
             if len(MINERS.values()) == 0 or len(COUNTS_PER_ENV.values()) == 0: return None
-            # Get all hotkey, revision pairs to select from.
-            pairs = [ (m.hotkey, m.revision) for m in MINERS.values() ]
+            # All hotkey, revision pairs to select from (built once per refresh).
+            pairs = PAIRS
             # Get a weight per env.
             weights_per_env = {env_name: 1/(sum(env_counts.values()) + 1) for env_name, env_counts in COUNTS_PER_ENV.items()}
             # Select the env with the least number of samples.
@@ -74,7 +76,7 @@ def runner():
             # Get all counts for the worst env.
             env_counts = COUNTS_PER_ENV[worst_env]
             # Get the average env count.
-            mean_env_count = sum([ c for c in env_counts.values() ])/(len(pairs) + EPS)
+            mean_env_count = sum(env_counts.values())/(len(pairs) + EPS)
             # Weight to be selected is mean/(count + backoff)
             weights_hotkey_env = { p: (mean_env_count + EPS)/(env_counts.get(p, 0) + BACKOFF[p] + EPS) for p in pairs }
             # Pick the miner with weights.
@@ -97,6 +99,57 @@ def runner():
         inflight_semaphore = asyncio.Semaphore(30)
         state_lock = asyncio.Lock()  # Protect shared state variables
 
+        # Results are buffered and written in batches: one signer call + one insert per flush.
+        SINK_BATCH = int(os.getenv("AFFINE_SINK_BATCH", "16"))
+        SINK_INTERVAL = float(os.getenv("AFFINE_SINK_INTERVAL", "30"))
+        SINK_MAX_PENDING = int(os.getenv("AFFINE_SINK_MAX_PENDING", "5000"))  # bound during DB outages
+        PENDING: List[Any] = []
+        last_flush = time.monotonic()
+
+        def transient(e: BaseException) -> bool:
+            """Worth requeueing: cancellation or a connection-level failure, not a row the DB rejects."""
+            return (
+                not isinstance(e, Exception)
+                or isinstance(e, (asyncio.TimeoutError, OSError, OperationalError, InterfaceError))
+                or bool(getattr(e, "connection_invalidated", False))
+            )
+
+        def requeue(results: List[Any]) -> None:
+            # Inserts are idempotent on (hotkey, challenge_id); keep the results for the next flush,
+            # also when the flushing task is cancelled (the batch holds other tasks' results).
+            nonlocal PENDING
+            PENDING = results + PENDING
+            if len(PENDING) > SINK_MAX_PENDING:
+                af.logger.warning(f"Sink backlog over {SINK_MAX_PENDING}; dropping {len(PENDING) - SINK_MAX_PENDING} oldest results")
+                PENDING = PENDING[-SINK_MAX_PENDING:]
+
+        async def flush():
+            nonlocal PENDING, last_flush
+            batch, PENDING = PENDING, []
+            last_flush = time.monotonic()
+            if not batch:
+                return
+            try:
+                async with sink_semaphore:
+                    await af.sink(wallet=wallet, results=batch)
+                return
+            except BaseException as e:
+                if transient(e):
+                    requeue(batch)
+                    raise
+                af.logger.warning(f"Sink of {len(batch)} results failed ({e}); retrying one by one")
+            # One row the DB can never take (e.g. a NUL byte in text) must not sink the whole batch:
+            # insert individually and drop only what still fails.
+            for k, r in enumerate(batch):
+                try:
+                    async with sink_semaphore:
+                        await af.sink(wallet=wallet, results=[r])
+                except BaseException as e:
+                    if transient(e):
+                        requeue(batch[k:])
+                        raise
+                    af.logger.warning(f"Dropping unsinkable result from uid {r.miner.uid}: {e}")
+
         async def one():
             async with inflight_semaphore:
                 sel = await next()
@@ -116,8 +169,9 @@ def runner():
                     else:
                         BACKOFF[pair] += 10
                     COUNTS_PER_ENV[env_name][pair] = COUNTS_PER_ENV[env_name].get(pair, 0) + 1
-                async with sink_semaphore:
-                    await af.sink(wallet=wallet, results=results)
+                PENDING.extend(results)
+                if len(PENDING) >= SINK_BATCH or time.monotonic() - last_flush >= SINK_INTERVAL:
+                    await flush()
 
         while True:
             try:
@@ -158,7 +212,10 @@ def runner():
                 if running_tasks:
                     for task in running_tasks:
                         task.cancel()
-                    
+                    # Let cancelled flushes put their batches back before the final flush.
+                    await asyncio.gather(*running_tasks, return_exceptions=True)
+                await flush()
+
             except Exception as e:
                 af.logger.warning(f'Exception:{e}')
                 af.logger.warning(traceback.format_exc())
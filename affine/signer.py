@@ -24,7 +24,7 @@ async def sign_results(wallet: Any, results: List["af.Result"]) -> Tuple[str, Li
         signer_url = af.get_conf("SIGNER_URL", default="http://signer:8080")
         timeout = aiohttp.ClientTimeout(connect=2, total=30)
         async with aiohttp.ClientSession(timeout=timeout) as session:
-            payloads = [str(r.challenge) for r in results]
+            payloads = [r.sign_payload() for r in results]
             resp = await session.post(f"{signer_url}/sign", json={"payloads": payloads})
             if resp.status == 200:
                 data = await resp.json()
@@ -37,8 +37,8 @@ async def sign_results(wallet: Any, results: List["af.Result"]) -> Tuple[str, Li
     except Exception as e:
         af.logger.trace(f"sink: signer unavailable, using local signing: {type(e).__name__}: {e}")
     hotkey_addr = wallet.hotkey.ss58_address
-    for r in results:
-        r.sign(wallet)
+    # Signing is CPU-bound; run the batch in a worker thread so the loop keeps serving queries.
+    await asyncio.to_thread(lambda: [r.sign(wallet) for r in results])
     return hotkey_addr, results
 
 async def _set_weights_with_confirmation(
@@ -166,7 +166,7 @@ def signer(host: str, port: int):
                 data = payload.get("payloads") or payload.get("data") or []
                 if isinstance(data, str):
                     data = [data]
-                sigs = [(wallet.hotkey.sign(data=d)).hex() for d in data]
+                sigs = await asyncio.to_thread(lambda: [(wallet.hotkey.sign(data=d)).hex() for d in data])
                 return web.json_response({
                     "success": True,
                     "signatures": sigs,
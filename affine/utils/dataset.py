@@ -21,6 +21,7 @@ class R2BufferedDataset:
         self.split          = split
         self.buffer_size    = buffer_size
         self.max_batch      = max_batch
+        self.low_water      = max(1, buffer_size // 2)
         self._rng           = random.Random(seed)
 
         self._buffer: Deque[Any] = deque()
@@ -61,19 +62,22 @@ class R2BufferedDataset:
             rows = await self._read_next_rows(desired)
             if not rows:
                 break
-            for item in rows:
-                self._buffer.append(item)
+            self._buffer.extend(rows)
         af.logger.trace("DB buffer fill complete")
 
+    def _maybe_refill(self) -> None:
+        # Refill in the background once the buffer drops to the low-water mark,
+        # so the DB fetch overlaps with consumers instead of running per item.
+        if len(self._buffer) <= self.low_water and (not self._fill_task or self._fill_task.done()):
+            self._fill_task = asyncio.create_task(self._fill_buffer())
+
     async def get(self) -> Any:
         async with self._lock:
-            if not self._fill_task or self._fill_task.done():
-                self._fill_task = asyncio.create_task(self._fill_buffer())
+            self._maybe_refill()
             if not self._buffer:
                 await self._fill_task
             item = self._buffer.popleft()
-            if self._fill_task.done():
-                self._fill_task = asyncio.create_task(self._fill_buffer())
+            self._maybe_refill()
             return item
 
     def __aiter__(self):
@@ -8,8 +8,7 @@ import subprocess
 import selectors
 import threading
 import time
-from contextlib import contextmanager
-from typing import List, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
 
 try:
     import resource  # POSIX only
@@ -23,8 +22,33 @@ DEFAULT_TIMEOUT_SEC   = 30           # wall‑clock limit
 CPU_TIME_SEC          = 10           # hard CPU seconds (POSIX only)
 MEM_LIMIT_BYTES       = 512 * 2**20  # 512 MiB
 MAX_OUTPUT_BYTES      = 1_000_000    # 1 MB per stream before truncation
+READ_CHUNK_BYTES      = 64 * 2**10   # bulk pipe read size
 _FENCE_RE  = re.compile(r"```(?:python)?\s*([\s\S]*?)```", re.IGNORECASE)
 _HAS_MAIN  = re.compile(r'if\s+__name__\s*==\s*[\'"]__main__[\'"]')
+_SOLVE_RUNNER = (
+    "\n\nif __name__ == \"__main__\":\n"
+    "    res = solve()\n"
+    "    if res is not None:\n"
+    "        import sys\n"
+    "        if isinstance(res, (list, tuple)):\n"
+    "            print(*res)\n"
+    "        else:\n"
+    "            print(res)\n"
+)
+
+
+def _decode(raw: bytes) -> str:
+    """UTF‑8 decode with universal newlines (what the old text‑mode pipes produced)."""
+    return raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _need_auto(src: str, out: str, err: str) -> bool:
+    """Silent run of a guard‑less program that defines solve(): it needs the runner."""
+    return (
+        not out.strip() and not err.strip()
+        and "def solve" in src
+        and not _HAS_MAIN.search(src)
+    )
 
 
 class ProgramExecutor:
@@ -63,26 +87,44 @@ class ProgramExecutor:
         m = _FENCE_RE.search(text)
         return (m.group(1) if m else text).strip()
 
-    @contextmanager
-    def _tempfile(self, content: str):
-        path: Optional[str] = None
+    def _write_tmp(self, content: str) -> str:
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".py", delete=False, encoding="utf-8"
+        ) as fh:
+            fh.write(content)
+            path = fh.name
+        with self._lock:
+            self._tmp_files.append(path)
+        return path
+
+    def _remove_tmp(self, path: str) -> None:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            finally:
+                with self._lock:
+                    if path in self._tmp_files:
+                        self._tmp_files.remove(path)
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen, grace: float = 0.2) -> None:
+        """Kill *proc*'s whole process group: SIGTERM, then SIGKILL after *grace* s (at once if 0)."""
+        if proc.poll() is not None:
+            return
         try:
-            with tempfile.NamedTemporaryFile(
-                mode="w", suffix=".py", delete=False, encoding="utf-8"
-            ) as fh:
-                fh.write(content)
-                path = fh.name
-            with self._lock:
-                self._tmp_files.append(path)
-            yield path
-        finally:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                finally:
-                    with self._lock:
-                        if path in self._tmp_files:
-                            self._tmp_files.remove(path)
+            if os.name != "nt":
+                if grace:
+                    os.killpg(proc.pid, 15)
+                    time.sleep(grace)
+                if proc.poll() is None:
+                    os.killpg(proc.pid, 9)
+            else:
+                proc.kill()
+        except Exception:
+            try:
+                proc.kill()
+            except Exception:
+                pass
 
     def _posix_rlimits(self) -> None:
         """Best‑effort resource limits; never raise."""
@@ -113,40 +155,53 @@ class ProgramExecutor:
     def _run_once(
         self,
         script: str,
-        stdin_data: str,
+        stdin_data: str | bytes,
+        owner: Optional["PreparedProgram"] = None,
     ) -> Tuple[str, str]:
         """
         Low‑level runner with incremental read and hard caps.
-        Returns (stdout, stderr)—each possibly truncated.
+        Returns (stdout, stderr)—each possibly truncated. With *owner*, the child is
+        registered there so `owner.close()` can kill it mid‑run.
         """
         start = time.time()
+        # Binary pipes: output is drained in bulk chunks and decoded once at the end.
         proc = subprocess.Popen(
             [sys.executable, script],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            bufsize=1,  # line‑buffered
             preexec_fn=(lambda: self._posix_rlimits()) if resource else None,
             close_fds=True,
+            # On POSIX, start a new process‑group (in the child, before exec) so we can kill
+            # children too; a parent‑side setpgid after Popen returns fails with EACCES.
+            start_new_session=(os.name != "nt"),
         )
+        if owner is not None and not owner._track(proc):
+            self._kill(proc, grace=0)  # owner closed while we were spawning
 
-        # On POSIX, start a new process‑group so we can kill children too
-        if os.name != "nt":
-            try:
-                os.setpgid(proc.pid, proc.pid)
-            except Exception:
-                pass
-
-        # Feed stdin then close
+        # Feed stdin then close. Payloads can exceed the pipe buffer and a child that never
+        # reads would block write(), so a daemon thread feeds it while the timed loop runs.
         if proc.stdin:
-            try:
-                proc.stdin.write(stdin_data)
-                proc.stdin.close()
-            except BrokenPipeError:
-                # Process terminated early, stdin pipe is broken
-                pass
+            if isinstance(stdin_data, str):
+                stdin_data = stdin_data.encode("utf-8")
+
+            def _feed(pipe, data: bytes) -> None:
+                try:
+                    if data:
+                        pipe.write(data)
+                except (BrokenPipeError, OSError, ValueError):
+                    # Process terminated early (or was killed), stdin pipe is broken
+                    pass
+                finally:
+                    try:
+                        pipe.close()
+                    except (BrokenPipeError, OSError, ValueError):
+                        pass
+
+            if stdin_data:
+                threading.Thread(target=_feed, args=(proc.stdin, stdin_data), daemon=True).start()
+            else:
+                _feed(proc.stdin, b"")
 
         sel = selectors.DefaultSelector()
         sel.register(proc.stdout, selectors.EVENT_READ)
@@ -162,18 +217,18 @@ class ProgramExecutor:
                 truncated = True
                 break
             for key, _ in sel.select(timeout=0.1):
-                chunk = key.fileobj.readline()
+                chunk = os.read(key.fd, READ_CHUNK_BYTES)
                 if not chunk:
                     sel.unregister(key.fileobj)
                     continue
                 if key.fileobj is proc.stdout:
-                    out_size += len(chunk.encode())
+                    out_size += len(chunk)
                     out_buf.append(chunk)
                     if out_size > self.max_output:
                         truncated = True
                         break
                 else:
-                    err_size += len(chunk.encode())
+                    err_size += len(chunk)
                     err_buf.append(chunk)
                     if err_size > self.max_output:
                         truncated = True
@@ -184,28 +239,22 @@ class ProgramExecutor:
                 break
 
         # If truncated or timed out, kill the whole group
-        if truncated and proc.poll() is None:
-            try:
-                if os.name != "nt":
-                    os.killpg(proc.pid, 15)
-                    time.sleep(0.2)
-                    if proc.poll() is None:
-                        os.killpg(proc.pid, 9)
-                else:
-                    proc.kill()
-            except Exception:
-                pass
+        if truncated:
+            self._kill(proc)
 
         # Drain any remaining output
         try:
             rest_out, rest_err = proc.communicate(timeout=0.2)
-            out_buf.append(rest_out or "")
-            err_buf.append(rest_err or "")
+            out_buf.append(rest_out or b"")
+            err_buf.append(rest_err or b"")
         except Exception:
             pass
 
-        out_text = "".join(out_buf)
-        err_text = "".join(err_buf)
+        if owner is not None:
+            owner._untrack(proc)
+
+        out_text = _decode(b"".join(out_buf))
+        err_text = _decode(b"".join(err_buf))
         if truncated:
             suffix = "\n…<truncated>"
             if len(out_text.encode()) > self.max_output:
@@ -217,45 +266,18 @@ class ProgramExecutor:
 
         return out_text, err_text
 
+    def prepare(self, raw_code: str) -> "PreparedProgram":
+        """Strip and write *raw_code* once, for running against many stdins."""
+        return PreparedProgram(self, raw_code)
+
     def execute(self, raw_code: str, stdin: str | bytes = "") -> Tuple[str, str]:
         """
         Run *raw_code* with *stdin*.
         • Strips ``` fences.
         • If no output/error and a solve() exists without a guard, append a small runner and re‑run.
         """
-        code = self._strip_fences(raw_code)
-
-        def _need_auto(src: str, out: str, err: str) -> bool:
-            return (
-                not out.strip() and not err.strip()
-                and "def solve" in src
-                and not _HAS_MAIN.search(src)
-            )
-
-        with self._tempfile(code) as script:
-            try:
-                out, err = self._run_once(script, stdin)
-            except subprocess.SubprocessError as e:
-                return "", f"Execution error: {e}"
-
-            if _need_auto(code, out, err):
-                runner = (
-                    "\n\nif __name__ == \"__main__\":\n"
-                    "    res = solve()\n"
-                    "    if res is not None:\n"
-                    "        import sys\n"
-                    "        if isinstance(res, (list, tuple)):\n"
-                    "            print(*res)\n"
-                    "        else:\n"
-                    "            print(res)\n"
-                )
-                with self._tempfile(code + runner) as auto_script:
-                    try:
-                        out, err = self._run_once(auto_script, stdin)
-                    except subprocess.SubprocessError as e:
-                        return "", f"Execution error: {e}"
-
-        return out, err
+        with self.prepare(raw_code) as prog:
+            return prog.run(stdin)
 
     def cleanup(self) -> None:
         """Remove any lingering temp files."""
@@ -266,3 +288,72 @@ class ProgramExecutor:
                 except Exception:
                     pass
             self._tmp_files.clear()
+
+
+class PreparedProgram:
+    """
+    A program written to disk once, then run against many stdins. Every run is still a
+    fresh sandboxed child; only the temp script is shared. Thread‑safe, so cases may run
+    concurrently. Use as a context manager or `close()`; a closed program refuses to run.
+    """
+
+    def __init__(self, executor: ProgramExecutor, raw_code: str) -> None:
+        self._ex = executor
+        self.code = executor._strip_fences(raw_code)
+        self._scripts: Dict[str, str] = {}   # source → temp path
+        self._closed = False
+        self._procs: Set[subprocess.Popen] = set()   # live children, killed on close()
+        self._lock = threading.Lock()
+
+    def _script(self, content: str) -> Optional[str]:
+        """Temp path for *content*, written on first use; None once closed."""
+        with self._lock:
+            if self._closed:
+                return None
+            path = self._scripts.get(content)
+            if path is None:
+                path = self._scripts[content] = self._ex._write_tmp(content)
+            return path
+
+    def _track(self, proc: subprocess.Popen) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._procs.add(proc)
+            return True
+
+    def _untrack(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.discard(proc)
+
+    def run(self, stdin: str | bytes = "") -> Tuple[str, str]:
+        try:
+            script = self._script(self.code)
+            if script is None:
+                return "", "Execution error: program closed"
+            out, err = self._ex._run_once(script, stdin, self)
+            if _need_auto(self.code, out, err):
+                script = self._script(self.code + _SOLVE_RUNNER)
+                if script is None:
+                    return "", "Execution error: program closed"
+                out, err = self._ex._run_once(script, stdin, self)
+        except subprocess.SubprocessError as e:
+            return "", f"Execution error: {e}"
+        return out, err
+
+    def close(self) -> None:
+        """Kill children still running (e.g. siblings of a fast‑failed case) and remove the scripts."""
+        with self._lock:
+            self._closed = True
+            procs, self._procs = list(self._procs), set()
+            for path in self._scripts.values():
+                self._ex._remove_tmp(path)
+            self._scripts.clear()
+        for proc in procs:
+            self._ex._kill(proc, grace=0)
+
+    def __enter__(self) -> "PreparedProgram":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
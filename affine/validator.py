@@ -4,17 +4,24 @@
 #                             Imports                                         #
 # --------------------------------------------------------------------------- #
 from __future__ import annotations
-import math
 import time
 import asyncio
 import traceback
 import itertools
+import numpy as np
 import bittensor as bt
 from tabulate import tabulate
-from collections import defaultdict
 from typing import Any, Dict, List, Optional, Union, Tuple, Sequence, Literal, TypeVar, Awaitable
 import affine as af
 
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # pulled in by bittensor's substrate client
+    ConnectionClosed = OSError  # type: ignore
+
+# Errors that mean the subtensor socket is gone (reconnect); anything else keeps the connection.
+_NETWORK_ERRORS = (ConnectionClosed, OSError, asyncio.TimeoutError)
+
 # --- Scoring hyperparameters --------------------------------------------------
 TAIL = 20_000
 ALPHA = 0.9
@@ -49,111 +56,169 @@ async def get_weights(tail: int = TAIL, scale: float = 1):
     # --- fetch + prune --------------------------------------------------------
     st = await af.get_subtensor()
     meta = await st.metagraph(af.NETUID)
-    BASE_HK = meta.hotkeys[0]
     N_envs = len(af.ENVS)
-
-    # Tallies for all known hotkeys (so metrics update is safe even if some have no data)
-    cnt   = {hk: defaultdict(int)   for hk in meta.hotkeys}  # per-env counts
-    succ  = {hk: defaultdict(int)   for hk in meta.hotkeys}  # per-env correct (0/1 or [0,1])
-    first_block = {}                                          # earliest block for current version
+    H = len(meta.hotkeys)
+
+    # Tallies for all known hotkeys (so metrics update is safe even if some have no data).
+    # Dense [hotkey, env] arrays; rows follow meta.hotkeys (row == uid), columns follow ENVS.
+    ENV_NAMES = list(af.ENVS)
+    env_idx = {e: j for j, e in enumerate(ENV_NAMES)}
+    hk_idx  = {hk: i for i, hk in enumerate(meta.hotkeys)}
+    cnt   = np.zeros((H, N_envs), dtype=np.int64)    # per-env counts
+    succ  = np.zeros((H, N_envs), dtype=np.float64)  # per-env correct (0/1 or [0,1])
     current_miners = await af.get_miners(meta=meta)
-    prev  = { m.hotkey: m for m in current_miners.values() }
     pairs = [ (mi.hotkey, mi.revision) for mi in current_miners.values() ]
-    for env in af.ENVS:
+    # Per-env aggregates are independent queries: issue them together, not one after another.
+    aggs = await asyncio.gather(
+        *(af.aggregate_success_by_env(env_name=str(env), pairs=pairs) for env in af.ENVS),
+        return_exceptions=True,
+    )
+    for env, agg in zip(af.ENVS, aggs):
+        j = env_idx[env]
         try:
-            agg = await af.aggregate_success_by_env(env_name=str(env), pairs=pairs)
+            if isinstance(agg, BaseException):
+                raise agg
             total_suc = 0
             for hk, stats in agg.items():
+                i = hk_idx.get(hk)
                 n = int(stats.get("n_success", 0) or 0)
                 s = float(stats.get("sum_score", 0.0) or 0.0)
-                if n:
-                    cnt[hk][str(env)] += n
-                    succ[hk][str(env)] += s
+                if n and i is not None:
+                    cnt[i, j] += n
+                    succ[i, j] += s
                     total_suc += n
                 
             af.logger.trace(f'Aggregated {total_suc} successes for env: {env}')
         except Exception as e:
             af.logger.warning(f'Error in dataset polling (agg) for env {env}... {e}')
-    # --- accuracy + MAXENV ----------------------------------------------------
-    acc = {
-        hk: {e: (succ[hk][e] / cnt[hk][e] if cnt[hk][e] else 0.0) for e in af.ENVS}
-        for hk in meta.hotkeys
-    }
+
+    # --- scoring off the event loop -------------------------------------------
+    # Pure CPU work; running it inline would stall the heartbeat/watchdog on big metagraphs.
+    loop = asyncio.get_running_loop()
+    uids, weights, summary, (max_acc, weight_l, acc_l) = await loop.run_in_executor(
+        None, _compute_weights, list(meta.hotkeys), current_miners, cnt, succ, scale
+    )
+
+    # --- Prometheus updates + summary (on the loop) ---------------------------
+    # Gauge children are cached per label set (af.labelled): one client lookup per process.
+    for j, e in enumerate(ENV_NAMES):
+        af.labelled(af.MAXENV, e).set(max_acc[j])
+    for uid in range(H):
+        af.labelled(af.WEIGHT, uid).set(weight_l[uid])
+        for j, e in enumerate(ENV_NAMES):
+            a = acc_l[uid][j]
+            if a > 0:
+                af.labelled(af.SCORE, uid, e).set(a)
+    print("Validator Summary:", summary, sep="\n")  # no concatenated copy of the table
+    return uids, weights
+
+
+def _compute_weights(
+    hotkeys: List[str],
+    current_miners: Dict[int, Any],
+    cnt: np.ndarray,
+    succ: np.ndarray,
+    scale: float,
+) -> Tuple[List[int], List[float], str, Tuple[List[float], List[float], List[List[float]]]]:
+    """
+    Synchronous scoring core of `get_weights` (steps 2-5), safe to run in a worker thread:
+    touches no event loop and no Prometheus metrics.
+
+    Returns:
+      (uids, weights, summary table text, (max_acc per env, weight per uid, acc per uid × env))
+    """
+    N_envs = len(af.ENVS)
+    H = len(hotkeys)
+    ENV_NAMES = list(af.ENVS)
+    env_idx = {e: j for j, e in enumerate(ENV_NAMES)}
+    hk_idx  = {hk: i for i, hk in enumerate(hotkeys)}
+    first_block = {}                                          # earliest block for current version
+    prev  = { m.hotkey: m for m in current_miners.values() }
+    # Row-indexed miner state: which rows have a live miner, and its commit block.
+    active    = np.zeros(H, dtype=bool)
+    block_arr = np.zeros(H, dtype=np.int64)
+    for m in current_miners.values():
+        i = hk_idx[m.hotkey]
+        active[i], block_arr[i] = True, int(m.block)
+    block_l = block_arr.tolist()
+
+    # --- accuracy -------------------------------------------------------------
+    acc = np.divide(succ, cnt, out=np.zeros_like(succ), where=cnt > 0)  # 0 where no samples
+    acc_l = acc.tolist()  # plain floats for the per-uid metric loops
 
     active_hks = list(prev.keys())
-    for e in af.ENVS:
-        max_e = max((acc[hk][e] for hk in active_hks), default=0.0)
-        af.MAXENV.labels(env=e).set(max_e)
-    af.logger.info("Computed accuracy & updated MAXENV.")
+    max_acc = acc[active].max(axis=0) if active.any() else np.zeros(N_envs)
+    af.logger.info("Computed accuracy.")
 
     # --- eligibility: require near-max samples per env ------------------------
-    required = {
-        e: 150 + int(ELIG * max((cnt[hk][e] for hk in active_hks), default=0))
-        for e in af.ENVS
-    }
-    eligible = {hk for hk in active_hks if all(cnt[hk][e] >= required[e] for e in af.ENVS)}
+    max_cnt  = cnt[active].max(axis=0) if active.any() else np.zeros(N_envs, dtype=np.int64)
+    required = 150 + (ELIG * max_cnt).astype(np.int64)
+    elig_row = (active & (cnt >= required).all(axis=1)).tolist()
+    eligible = {hk for hk in active_hks if elig_row[hk_idx[hk]]}
 
     # --- ε-Pareto dominance helpers ------------------------------------------
-    def thr_not_worse(a_i: float, n_i: int, a_j: float, n_j: int) -> float:
-        """Tolerance for 'not worse' on an env: max(EPS_FLOOR, Z * SE_diff)."""
-        if Z_NOT_WORSE <= 0:
-            return EPS_FLOOR
-        var = (a_i * (1 - a_i)) / max(n_i, 1) + (a_j * (1 - a_j)) / max(n_j, 1)
-        return max(EPS_FLOOR, Z_NOT_WORSE * math.sqrt(var))
-
-    def thr_better(a_i: float, n_i: int, a_j: float, n_j: int, nw: float) -> float:
+    pool_for_dom = eligible if eligible else set(active_hks)
+    pool_hks = list(pool_for_dom)                     # pool order == array position below
+    pool_idx = np.array([hk_idx[hk] for hk in pool_hks], dtype=np.int64)
+
+    def pair_tests(A: np.ndarray, N: np.ndarray):
         """
-        Margin to claim 'better on at least one env'. Kept ≤ 'not worse' tolerance.
-        Floor-based by default; set Z_WIN>0 to scale with SE_diff.
+        Per-env pairwise ε-tests over the pool as [E, P, P] bool arrays (row = a, col = b):
+          not_worse: a >= b - nw, with nw = max(EPS_FLOOR, Z_NOT_WORSE * SE_diff)
+          better:    a >= b + min(max(EPS_WIN, Z_WIN * SE_diff), nw)  (floor-based when Z_WIN == 0)
+          tie:       |a - b| <= nw
         """
-        if Z_WIN > 0:
-            var = (a_i * (1 - a_i)) / max(n_i, 1) + (a_j * (1 - a_j)) / max(n_j, 1)
-            t = max(EPS_WIN, Z_WIN * math.sqrt(var))
-        else:
-            t = EPS_WIN
-        return min(t, nw)
-
-    def dominates_on(a: str, b: str, subset) -> bool:
+        A, N = A.T, N.T                                   # [E, P]
+        ai, aj = A[:, :, None], A[:, None, :]
+        v = (A * (1 - A)) / np.maximum(N, 1)
+        var = v[:, :, None] + v[:, None, :]
+        nw = np.maximum(EPS_FLOOR, Z_NOT_WORSE * np.sqrt(var)) if Z_NOT_WORSE > 0 else np.full_like(var, EPS_FLOOR)
+        bet = np.maximum(EPS_WIN, Z_WIN * np.sqrt(var)) if Z_WIN > 0 else EPS_WIN
+        bet = np.minimum(bet, nw)
+        return ~(ai < aj - nw), ai >= aj + bet, ~(np.abs(ai - aj) > nw)
+
+    def pack(m: np.ndarray) -> np.ndarray:
+        """[E, P, P] bools → [P, P] uint64 masks, bit j <-> env column j (packbits: 8 envs per byte pass)."""
+        b = np.packbits(m, axis=0, bitorder="little")
+        out = np.zeros(m.shape[1:], dtype=np.uint64)
+        for k in range(b.shape[0]):
+            out |= b[k].astype(np.uint64) << np.uint64(8 * k)
+        return out
+
+    # Thresholds depend only on (a, b, env): compute them once, not per subset, and pack
+    # each pair's per-env outcomes into one bitmask.
+    NOT_WORSE, BETTER, TIE = (pack(m) for m in pair_tests(acc[pool_idx], cnt[pool_idx]))
+    fb = np.array([first_block.get(hk, np.inf) for hk in pool_hks], dtype=np.float64)
+    EARLIER = fb[:, None] < fb[None, :]
+
+    def dom_counts(js) -> np.ndarray:
         """
-        True iff 'a' is not-worse than 'b' on every env in `subset` (within thr_not_worse),
-        and strictly better on at least one env by thr_better. Full ε-ties break by earlier start.
+        Per-pool-member number of rivals it ε-dominates on env columns `js`: not-worse on every env
+        (within thr_not_worse) and better on at least one by thr_better; full ε-ties break by earlier start.
+        Subset tests are mask ops per pair: all ⇔ (m & S) == S, any ⇔ (m & S) != 0.
         """
-        not_worse_all = True
-        better_any    = False
-        tie_all       = True
-        for e in subset:
-            ai, aj = acc[a][e], acc[b][e]
-            ni, nj = cnt[a][e], cnt[b][e]
-            nw  = thr_not_worse(ai, ni, aj, nj)
-            bet = thr_better(ai, ni, aj, nj, nw)
-
-            if ai < aj - nw:
-                not_worse_all = False
-            if ai >= aj + bet:
-                better_any = True
-            if abs(ai - aj) > nw:
-                tie_all = False
-
-        if not_worse_all and better_any:
-            return True
-        if tie_all and first_block.get(a, float("inf")) < first_block.get(b, float("inf")):
-            return True
-        return False
+        S = np.uint64(sum(1 << j for j in js))
+        D = (((NOT_WORSE & S) == S) & ((BETTER & S) != 0)) | (((TIE & S) == S) & EARLIER)
+        np.fill_diagonal(D, False)
+        return D.sum(axis=1)
 
     # Global dominance (full ENVS) for summary + canonical "best"
-    dom_full = defaultdict(int)
-    pool_for_dom = eligible if eligible else set(active_hks)
-    for a, b in itertools.permutations(pool_for_dom, 2):
-        if dominates_on(a, b, af.ENVS):
-            dom_full[a] += 1
+    dom_full = dom_counts(range(N_envs))
     af.logger.info("Computed ε-dominance counts (full env set).")
 
     def ts(hk: str) -> int:
         """Block-number timestamp; default to last seen block."""
-        return int(first_block.get(hk, prev[hk].block))
+        return int(first_block.get(hk, block_l[hk_idx[hk]]))
+
+    ts_pool  = np.array([ts(hk) for hk in pool_hks], dtype=np.int64)
+    acc_pool = acc[pool_idx]
 
-    best = max(pool_for_dom, key=lambda hk: (dom_full.get(hk, 0), -ts(hk))) if pool_for_dom else active_hks[0]
-    best_uid = meta.hotkeys.index(best)
+    def pick(*keys: np.ndarray) -> str:
+        """Pool member ranked first by `keys` (primary first, ascending); exact ties keep pool order."""
+        return pool_hks[int(np.lexsort(keys[::-1])[0])]
+
+    best = pick(-dom_full, ts_pool) if pool_for_dom else active_hks[0]
+    best_uid = hotkeys.index(best)
 
     # --- combinatoric scoring over all non-empty env subsets ------------------
     def layer_weights(N: int, kappa: float):
@@ -169,20 +234,14 @@ async def get_weights(tail: int = TAIL, scale: float = 1):
           1) highest mean accuracy on the subset,
           2) earliest version start block.
         """
-        dom_local = defaultdict(int)
-        for x, y in itertools.permutations(pool_for_dom, 2):
-            if dominates_on(x, y, env_subset):
-                dom_local[x] += 1
-
-        def mean_acc(hk: str) -> float:
-            return sum(acc[hk][e] for e in env_subset) / len(env_subset)
-
-        return max(pool_for_dom, key=lambda hk: (dom_local.get(hk, 0), mean_acc(hk), -ts(hk)))
+        js = [env_idx[e] for e in env_subset]
+        mean_acc = acc_pool[:, js].sum(axis=1) / len(js)
+        return pick(-dom_counts(js), -mean_acc, ts_pool)
 
-    # Calculate combinatoric scores for all miners (not just eligible)
+    # Calculate combinatoric scores for all miners (not just eligible), per row
     K = layer_weights(N_envs, scale)
-    score = defaultdict(float)
-    layer_points = {hk: defaultdict(float) for hk in active_hks}
+    score = np.zeros(H, dtype=np.float64)                   # total points
+    layer_points = np.zeros((H, N_envs), dtype=np.float64)  # points per subset size (column s-1)
 
     # --- Find single-env winners for highlighting ----------------------------
     env_winners = {}
@@ -192,101 +251,72 @@ async def get_weights(tail: int = TAIL, scale: float = 1):
     # Award K_s to each subset winner
     for s in range(1, N_envs + 1):
         for env_subset in itertools.combinations(af.ENVS, s):
-            w = subset_winner(env_subset)
+            w = hk_idx[subset_winner(env_subset)]
             score[w] += K[s]
-            layer_points[w][s] += K[s]
+            layer_points[w, s - 1] += K[s]
+
+    # --- summary table --------------------------------------------------------
+    hdr = (
+        ["UID", "Model", "Rev"]
+        + [f"{e}" for e in af.ENVS]
+        + [f"L{s}" for s in range(1, N_envs + 1)]
+        + ["Pts", "Elig", "Wgt"]
+    )
+    is_winner = np.zeros((H, N_envs), dtype=bool)
+    for j, e in enumerate(ENV_NAMES):
+        is_winner[hk_idx[env_winners[e]], j] = True
+
+    def summary_rows(hks: List[str], wgt: Sequence[float], model_w: int) -> List[list]:
+        """Rows for `hks` ordered by points (desc, stable); cells are formatted column-wise."""
+        if not hks:
+            return []
+        ri = np.array([hk_idx[hk] for hk in hks], dtype=np.int64)
+        env_cells = np.char.add(np.char.add(np.char.mod("%.2f", 100 * acc[ri]), "/"), cnt[ri].astype(str))
+        env_cells = np.where(is_winner[ri], np.char.add(np.char.add("*", env_cells), "*"), env_cells)
+        lp  = np.char.mod("%.1f", layer_points[ri]).tolist()
+        pts = np.char.mod("%.2f", score[ri])
+        w_s = np.char.mod("%.4f", np.asarray(wgt, dtype=np.float64)).tolist()
+        env_cells, order, pts = env_cells.tolist(), np.argsort(-pts.astype(np.float64), kind="stable").tolist(), pts.tolist()
+        rows = []
+        for r in order:
+            m = prev[hks[r]]
+            rows.append([
+                m.uid, str(m.model)[:model_w], str(m.revision)[:5],
+                *env_cells[r], *lp[r], pts[r],
+                "Y" if hks[r] in eligible else "N",
+                w_s[r],
+            ])
+        return rows
 
     # If no eligible miners exist, fall back to the canonical best with weight 1.0.
     if not eligible:
         af.logger.warning("No eligible miners; assigning weight 1.0 to canonical best.")
-        for uid, hk in enumerate(meta.hotkeys):
-            af.WEIGHT.labels(uid=uid).set(1.0 if hk == best else 0.0)
-            for e in af.ENVS:
-                a = acc[hk][e]
-                if a > 0:
-                    af.SCORE.labels(uid=uid, env=e).set(a)
-
-        hdr = (
-            ["UID", "Model", "Rev"]
-            + [f"{e}" for e in af.ENVS]
-            + [f"L{s}" for s in range(1, N_envs + 1)]
-            + ["Pts", "Elig", "Wgt"]
-        )
-        def row(hk: str):
-            m = prev[hk]
-            w = 1.0 if hk == best else 0.0
-            model_name = str(m.model)[:50]
-            env_cols = []
-            for e in af.ENVS:
-                base = f"{100 * acc[hk][e]:.2f}/{cnt[hk][e]}"
-                if hk == env_winners.get(e):
-                    env_cols.append(f"*{base}*")
-                else:
-                    env_cols.append(base)
-            return [
-                m.uid, model_name, str(m.revision)[:5],
-                *env_cols,
-                *[f"{layer_points[hk][s]:.1f}" for s in range(1, N_envs + 1)],
-                f"{score.get(hk, 0.0):.2f}",
-                "Y" if hk in eligible else "N",
-                f"{w:.4f}",
-            ]
-        rows = sorted((row(hk) for hk in active_hks), key=lambda r: (r[-3], r[0]), reverse=True)
-        print("Validator Summary:\n" + tabulate(rows, hdr, tablefmt="plain"))
-        return [best_uid], [1.0]
+        weight_l = [1.0 if hk == best else 0.0 for hk in hotkeys]
+        rows = summary_rows(active_hks, [1.0 if hk == best else 0.0 for hk in active_hks], 50)
+        summary = tabulate(rows, hdr, tablefmt="plain")
+        return [best_uid], [1.0], summary, (max_acc.tolist(), weight_l, acc_l)
 
     # Eligible path: normalize scores to weights over the eligible pool only
-    total_points = sum(score[hk] for hk in eligible)
+    total_points = sum(score[hk_idx[hk]] for hk in eligible)
     if total_points <= 0:
         af.logger.warning("Combinatoric scoring returned zero total; falling back to canonical best.")
         weight_by_hk = {hk: (1.0 if hk == best else 0.0) for hk in eligible}
     else:
-        weight_by_hk = {hk: (score[hk] / total_points) for hk in eligible}
+        weight_by_hk = {hk: float(score[hk_idx[hk]] / total_points) for hk in eligible}
 
     # --- summary printout -----------------------------------------------------
-    hdr = (
-        ["UID", "Model", "Rev"]
-        + [f"{e}" for e in af.ENVS]
-        + [f"L{s}" for s in range(1, N_envs + 1)]
-        + ["Pts", "Elig", "Wgt"]
-    )
-    def row(hk: str):
-        m = prev[hk]
-        w = weight_by_hk.get(hk, 0.0)
-        model_name = str(m.model)[:50]
-        env_cols = []
-        for e in af.ENVS:
-            base = f"{100 * acc[hk][e]:.2f}/{cnt[hk][e]}"
-            if hk == env_winners.get(e):
-                env_cols.append(f"*{base}*")
-            else:
-                env_cols.append(base)
-        return [
-            m.uid, model_name[:30], str(m.revision)[:5],
-            *env_cols,
-            *[f"{layer_points[hk][s]:.1f}" for s in range(1, N_envs + 1)],
-            f"{score.get(hk, 0.0):.2f}",
-            "Y" if hk in eligible else "N",
-            f"{w:.4f}",
-        ]
-    ranked_rows   = sorted((row(hk) for hk in eligible), key=lambda r: float(r[-3]), reverse=True)
-    unranked_rows = sorted((row(hk) for hk in active_hks if hk not in eligible), key=lambda r: float(r[-3]), reverse=True)
-    rows = ranked_rows + unranked_rows
-    print("Validator Summary:\n" + tabulate(rows, hdr, tablefmt="plain"))
-
-    # --- Prometheus updates ---------------------------------------------------
-    for uid, hk in enumerate(meta.hotkeys):
-        af.WEIGHT.labels(uid=uid).set(weight_by_hk.get(hk, 0.0))
-        for e in af.ENVS:
-            a = acc[hk][e]
-            if a > 0:
-                af.SCORE.labels(uid=uid, env=e).set(a)
+    ranked   = list(eligible)
+    unranked = [hk for hk in active_hks if hk not in eligible]
+    rows = (summary_rows(ranked, [weight_by_hk[hk] for hk in ranked], 30)
+            + summary_rows(unranked, [0.0] * len(unranked), 30))
+    summary = tabulate(rows, hdr, tablefmt="plain")
+    weight_l = [weight_by_hk.get(hk, 0.0) for hk in hotkeys]
 
     # --- Return weights in a stable shape (best last, as before) -------------
-    eligible_uids = [meta.hotkeys.index(hk) for hk in eligible]
+    eligible_uids = [hotkeys.index(hk) for hk in eligible]
     uids = [u for u in eligible_uids if u != best_uid] + [best_uid]
-    weights = [weight_by_hk.get(meta.hotkeys[u], 0.0) for u in uids]
-    return uids, weights
+    weights = [weight_by_hk.get(hotkeys[u], 0.0) for u in uids]
+    return uids, weights, summary, (max_acc.tolist(), weight_l, acc_l)
 
 
         
@@ -320,7 +350,6 @@ def validate():
                 # ---------------- Set weights. ------------------------
                 af.logger.info("Setting weights ...")
                 await af.retry_set_weights( wallet, uids=uids, weights=weights, retry = 3)
-                subtensor = await af.get_subtensor()
                 SETBLOCK = await subtensor.get_current_block()
                 af.LASTSET.set_function(lambda: SETBLOCK - LAST)
                 LAST = BLOCK           
@@ -329,7 +358,9 @@ def validate():
             except Exception as e:
                 traceback.print_exc()
                 af.logger.info(f"Error in validator loop: {e}. Continuing ...")
-                subtensor = None  # Force reconnection on next iteration
+                if isinstance(e, _NETWORK_ERRORS):
+                    await af.reset_subtensor()
+                    subtensor = None  # Force reconnection on next iteration
                 await asyncio.sleep(10)  # Wait before retrying
                 continue
             
@@ -343,4 +374,4 @@ def validate():
     
 @af.cli.command("weights")
 def weights():
-    asyncio.run(get_weights())
+    asyncio.run(af.closing_client(get_weights()))